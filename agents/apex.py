@@ -0,0 +1,216 @@
+# agents/apex.py
+from __future__ import annotations
+import queue
+import time
+from typing import Any, Dict
+import numpy as np
+import torch as th
+import torch.multiprocessing as mp
+from stable_baselines3 import DQN
+
+from envs.racing_env import RacingEnv
+from .dqn_agent import crear_dqn, politica_dqn
+from .replay import agregar_lote
+from .utils import resumen_entrenamiento
+
+# Entrenamiento distribuido estilo Ape-X (Horgan et al., 2018) en un solo host:
+# - N procesos ACTORES corren RacingEnv con su propio epsilon y envían transiciones
+#   en bloques de tensores (memoria compartida de torch.multiprocessing) por una cola.
+# - Un único LEARNER (proceso principal) llena el replay, entrena y publica pesos
+#   en tensores compartidos; los actores los recargan cuando cambia la versión.
+
+def epsilon_actor(i: int, n_actores: int, eps_base: float = 0.4, alpha: float = 7.0) -> float:
+    """eps_i = eps_base^(1 + alpha·i/(N-1)) como en Ape-X."""
+    if n_actores <= 1:
+        return eps_base
+    return float(eps_base ** (1.0 + alpha * i / (n_actores - 1)))
+
+def _actor(idx: int, ruta_csv: str, env_kwargs: Dict[str, Any], politica: str, epsilon: float,
+           pesos: Dict[str, th.Tensor], version, lock, cola, stop, bloque: int, seed: int):
+    th.set_num_threads(1)
+    # Al detenerse se descartan los bloques no consumidos (no bloquear la salida)
+    cola.cancel_join_thread()
+    rng = np.random.default_rng(seed)
+    env = RacingEnv(ruta_csv=ruta_csv, **env_kwargs)
+    nombre, policy_kwargs = politica_dqn(env.observation_space, politica)
+    policy = DQN.policy_aliases[nombre](env.observation_space, env.action_space,
+                                        lambda _: 0.0, **policy_kwargs)
+    q_net = policy.q_net
+    q_net.set_training_mode(False)
+    version_local = -1
+
+    obs, _ = env.reset(seed=seed)
+    ep_r, ep_l = 0.0, 0
+    buf_obs, buf_next, buf_meta, episodios = [], [], [], []
+    while not stop.is_set():
+        # Recarga pesos si el learner publicó una versión nueva
+        if version.value != version_local:
+            with lock:
+                q_net.load_state_dict(pesos)
+                version_local = version.value
+
+        if rng.random() < epsilon:
+            accion = int(rng.integers(env.action_space.n))
+        else:
+            with th.no_grad():
+                q = q_net(th.as_tensor(obs).unsqueeze(0))
+            accion = int(q.argmax(dim=1).item())
+
+        next_obs, r, terminado, truncado, info = env.step(accion)
+        buf_obs.append(obs)
+        buf_next.append(next_obs)
+        buf_meta.append((accion, r, float(terminado), float(truncado and not terminado)))
+        ep_r += r
+        ep_l += 1
+        obs = next_obs
+        if terminado or truncado:
+            episodios.append({"r": ep_r, "l": ep_l, "meta": bool(info.get("meta")),
+                              "choque": bool(info.get("choque"))})
+            obs, _ = env.reset()
+            ep_r, ep_l = 0.0, 0
+
+        if len(buf_obs) >= bloque:
+            msg = (idx, th.from_numpy(np.stack(buf_obs)), th.from_numpy(np.stack(buf_next)),
+                   th.tensor(buf_meta, dtype=th.float32), episodios)
+            while not stop.is_set():
+                try:
+                    cola.put(msg, timeout=0.5)
+                    break
+                except queue.Full:
+                    pass
+            buf_obs, buf_next, buf_meta, episodios = [], [], [], []
+    env.close()
+
+def entrenar_apex(
+    ruta_csv: str,
+    total_timesteps: int,
+    n_actores: int = 4,
+    env_kwargs: Dict[str, Any] | None = None,
+    bloque: int = 64,
+    sync_cada: int = 200,
+    ratio_replay: float | None = None,
+    grad_por_iter: int = 8,
+    eps_base: float = 0.4,
+    eps_alpha: float = 7.0,
+    seed: int = 42,
+    print_per_episode: bool = False,
+    **dqn_kwargs,
+) -> tuple[DQN, dict]:
+    """Entrena un DQN con N actores en procesos separados y un learner.
+
+    - El learner NO espera a los actores: en cada iteración vacía la cola (get_nowait),
+      escribe los bloques en el replay como rebanadas y hace 'grad_por_iter' pasos de gradiente.
+    - 'ratio_replay': tope opcional de pasos de gradiente por transición recibida
+      (None = sin tope; 1/train_freq reproduce la razón de DQN.learn).
+    - 'sync_cada': cada cuántos pasos de gradiente se publican pesos a los actores.
+    - 'dqn_kwargs' se pasan tal cual a crear_dqn (replay priorizado incluido).
+    Devuelve (modelo, resumen) con throughput total en 'pasos_por_seg'.
+    """
+    env_kwargs = dict(env_kwargs or {})
+    env = RacingEnv(ruta_csv=ruta_csv, **env_kwargs)
+    model = crear_dqn(env, **dqn_kwargs)
+    total_timesteps, _ = model._setup_learn(total_timesteps, tb_log_name="DQN_apex")
+    buffer = model.replay_buffer
+
+    ctx = mp.get_context("spawn")
+    pesos = {k: v.detach().cpu().clone().share_memory_() for k, v in model.q_net.state_dict().items()}
+    version = ctx.Value("i", 0)
+    lock = ctx.Lock()
+    stop = ctx.Event()
+    cola = ctx.Queue(maxsize=4 * n_actores)
+    actores = [
+        ctx.Process(target=_actor, daemon=True, args=(
+            i, ruta_csv, env_kwargs, dqn_kwargs.get("politica", "auto"), epsilon_actor(i, n_actores, eps_base, eps_alpha),
+            pesos, version, lock, cola, stop, bloque, seed + 1 + i))
+        for i in range(n_actores)
+    ]
+
+    def publicar_pesos():
+        with lock:
+            for k, v in model.q_net.state_dict().items():
+                pesos[k].copy_(v)
+            version.value += 1
+
+    ep_returns, ep_lengths = [], []
+    exitos, choques = 0, 0
+    pasos, grad_steps = 0, 0
+    ultimo_target, ultimo_sync = 0, 0
+    espera = []  # bloque recibido mientras el learner estaba ocioso
+
+    t0 = time.time()
+    for p in actores:
+        p.start()
+    try:
+        while pasos < total_timesteps:
+            # Vacía todos los bloques disponibles sin bloquear
+            bloques, espera = espera, []
+            while True:
+                try:
+                    bloques.append(cola.get_nowait())
+                except queue.Empty:
+                    break
+
+            for _, obs, next_obs, meta, episodios in bloques:
+                meta = meta.numpy()
+                acciones, rewards, dones, timeouts = meta[:, 0], meta[:, 1], meta[:, 2], meta[:, 3].copy()
+                # El bloque siguiente en el buffer puede ser de otro actor: el último paso
+                # de cada bloque se marca como truncado para no encadenar retornos n-step
+                if not dones[-1]:
+                    timeouts[-1] = 1.0
+                agregar_lote(buffer, obs.numpy(), next_obs.numpy(), acciones, rewards, dones, timeouts)
+                pasos += len(meta)
+
+                for ep in episodios:
+                    ep_returns.append(float(ep["r"]))
+                    ep_lengths.append(int(ep["l"]))
+                    exitos += int(ep["meta"])
+                    choques += int(ep["choque"])
+                    if print_per_episode:
+                        print(f"[EP {len(ep_returns)}] R={ep['r']:.2f} | L={ep['l']} | "
+                              f"meta={ep['meta']} | choque={ep['choque']}")
+            model.num_timesteps = pasos
+
+            # Gradiente continuo (limitado opcionalmente por ratio_replay)
+            g = 0
+            if pasos > model.learning_starts:
+                g = grad_por_iter
+                if ratio_replay is not None:
+                    tope = int(ratio_replay * (pasos - model.learning_starts))
+                    g = min(g, max(0, tope - grad_steps))
+            if g > 0:
+                model._update_current_progress_remaining(pasos, total_timesteps)
+                model.train(gradient_steps=g, batch_size=model.batch_size)
+                grad_steps += g
+            elif not bloques:
+                # Nada que entrenar ni recibir: espera un bloque en vez de girar en vacío
+                try:
+                    espera.append(cola.get(timeout=0.05))
+                except queue.Empty:
+                    pass
+
+            if pasos - ultimo_target >= model.target_update_interval:
+                model.q_net_target.load_state_dict(model.q_net.state_dict())
+                ultimo_target = pasos
+            if grad_steps - ultimo_sync >= sync_cada:
+                publicar_pesos()
+                ultimo_sync = grad_steps
+                model.logger.record("apex/pasos_por_seg", pasos / max(1e-9, time.time() - t0))
+                model.logger.dump(step=pasos)
+    finally:
+        stop.set()
+        for p in actores:
+            p.join(timeout=5.0)
+            if p.is_alive():
+                p.terminate()
+        env.close()
+
+    dur = time.time() - t0
+    if ep_returns:
+        resumen = resumen_entrenamiento(ep_returns, ep_lengths, exitos, choques, dur, pasos)
+    else:
+        resumen = {"episodios": 0, "tiempo_total": float(dur), "pasos_totales": int(pasos),
+                   "pasos_por_seg": float(pasos / dur) if dur > 0 else 0.0}
+    resumen["actores"] = int(n_actores)
+    resumen["pasos_gradiente"] = int(grad_steps)
+    resumen["grad_por_seg"] = float(grad_steps / dur) if dur > 0 else 0.0
+    return model, resumen
@@ -1,12 +1,17 @@
 # agents/dqn_agent.py
 from __future__ import annotations
 from typing import Dict, Any
+import numpy as np
 import torch as th
 import torch.nn as nn
+import torch.nn.functional as F
 from gymnasium.spaces import Box
 from stable_baselines3 import DQN
+from stable_baselines3.common.buffers import NStepReplayBuffer
 from stable_baselines3.common.torch_layers import BaseFeaturesExtractor
 
+from .replay import PrioritizedReplayBuffer
+
 class CNN6CExtractor(BaseFeaturesExtractor):
     """Extractor CNN robusto para HxWxC (C puede ser !=6; usamos shape del espacio)."""
     def __init__(self, observation_space: Box, features_dim: int = 256):
@@ -25,6 +30,74 @@ class CNN6CExtractor(BaseFeaturesExtractor):
         x = self.cnn(x)
         return self.linear(x)
 
+def politica_dqn(observation_space: Box, politica: str = "auto") -> tuple[str, Dict[str, Any]]:
+    """Nombre de política SB3 y policy_kwargs (compartido por crear_dqn y los actores Ape-X).
+
+    - politica="cnn": CnnPolicy + CNN6CExtractor (patch HxWxC).
+    - politica="mlp": MlpPolicy pequeña (sensor de rayos, vector 1D).
+    - politica="auto": elige según la forma del espacio de observación.
+    """
+    if politica == "auto":
+        politica = "cnn" if len(observation_space.shape) == 3 else "mlp"
+    if politica == "mlp":
+        return "MlpPolicy", dict(net_arch=[128, 128])
+    policy_kwargs: Dict[str, Any] = dict(
+        features_extractor_class=CNN6CExtractor,
+        features_extractor_kwargs=dict(features_dim=256),
+        normalize_images=False,
+    )
+    return "CnnPolicy", policy_kwargs
+
+class DQNPrioritizado(DQN):
+    """DQN que pondera la pérdida con los pesos IS del replay priorizado y
+    devuelve |TD| al buffer para actualizar prioridades (en lote).
+
+    beta se templa linealmente desde 'per_beta0' hasta 1.0 a lo largo del entrenamiento.
+    Con n_steps > 1 el target usa los 'discounts' (gamma^k) que entrega el buffer.
+    """
+    def __init__(self, *args, per_beta0: float = 0.4, **kwargs):
+        self.per_beta0 = float(per_beta0)
+        super().__init__(*args, **kwargs)
+
+    def train(self, gradient_steps: int, batch_size: int = 100) -> None:
+        self.policy.set_training_mode(True)
+        self._update_learning_rate(self.policy.optimizer)
+        # Templado de beta según progreso (1 -> 0 en _current_progress_remaining)
+        progreso = 1.0 - self._current_progress_remaining
+        self.replay_buffer.beta = self.per_beta0 + (1.0 - self.per_beta0) * progreso
+
+        losses = []
+        for _ in range(gradient_steps):
+            replay_data = self.replay_buffer.sample(batch_size, env=self._vec_normalize_env)
+            discounts = replay_data.discounts if replay_data.discounts is not None else self.gamma
+
+            with th.no_grad():
+                next_q_values = self.q_net_target(replay_data.next_observations)
+                next_q_values, _ = next_q_values.max(dim=1)
+                next_q_values = next_q_values.reshape(-1, 1)
+                target_q_values = replay_data.rewards + (1 - replay_data.dones) * discounts * next_q_values
+
+            current_q_values = self.q_net(replay_data.observations)
+            current_q_values = th.gather(current_q_values, dim=1, index=replay_data.actions.long())
+
+            # Huber por elemento ponderado por importance-sampling
+            elementwise = F.smooth_l1_loss(current_q_values, target_q_values, reduction="none")
+            loss = (replay_data.weights * elementwise).mean()
+            losses.append(loss.item())
+
+            td_errors = (current_q_values - target_q_values).detach().cpu().numpy()
+            self.replay_buffer.update_priorities(replay_data.indices, td_errors)
+
+            self.policy.optimizer.zero_grad()
+            loss.backward()
+            th.nn.utils.clip_grad_norm_(self.policy.parameters(), self.max_grad_norm)
+            self.policy.optimizer.step()
+
+        self._n_updates += gradient_steps
+        self.logger.record("train/n_updates", self._n_updates, exclude="tensorboard")
+        self.logger.record("train/loss", np.mean(losses))
+        self.logger.record("train/per_beta", self.replay_buffer.beta)
+
 def crear_dqn(
     env,
     tensorboard_log: str | None = "logs/tb",
@@ -37,15 +110,37 @@ def crear_dqn(
     exploration_fraction: float = 0.3,
     exploration_final_eps: float = 0.05,
     verbose: int = 1,              
+    prioritized: bool = False,
+    per_alpha: float = 0.6,
+    per_beta0: float = 0.4,
+    politica: str = "auto",
+    n_steps: int = 1,
 ) -> DQN:
-    """Crea un DQN con política CNN y extractor personalizado (acepta 8 canales)."""
-    policy_kwargs: Dict[str, Any] = dict(
-        features_extractor_class=CNN6CExtractor,
-        features_extractor_kwargs=dict(features_dim=256),
-        normalize_images=False,
-    )
-    return DQN(
-        policy="CnnPolicy",
+    """Crea un DQN con política CNN y extractor personalizado (acepta 8 canales).
+
+    Con politica="mlp" (o "auto" y observación de rayos) usa una MlpPolicy pequeña.
+
+    Con prioritized=True usa replay priorizado (SumTree) y pérdida ponderada por IS.
+    Con n_steps > 1 usa el NStepReplayBuffer de SB3 (o el priorizado en modo n-step);
+    DQN.train ya aplica los 'discounts' gamma^k en el target.
+    """
+    policy, policy_kwargs = politica_dqn(env.observation_space, politica)
+    extra: Dict[str, Any] = {}
+    algo = DQN
+    if prioritized:
+        algo = DQNPrioritizado
+        extra = dict(
+            replay_buffer_class=PrioritizedReplayBuffer,
+            replay_buffer_kwargs=dict(alpha=per_alpha, beta=per_beta0, n_steps=n_steps, gamma=gamma),
+            per_beta0=per_beta0,
+        )
+    elif n_steps > 1:
+        extra = dict(
+            replay_buffer_class=NStepReplayBuffer,
+            replay_buffer_kwargs=dict(n_steps=n_steps, gamma=gamma),
+        )
+    return algo(
+        policy=policy,
         env=env,
         learning_rate=lr,
         buffer_size=buffer_size,
@@ -58,4 +153,5 @@ def crear_dqn(
         verbose=verbose,                 # << configurable
         tensorboard_log=tensorboard_log,
         policy_kwargs=policy_kwargs,
+        **extra,
     )
@@ -0,0 +1,188 @@
+# agents/replay.py
+from __future__ import annotations
+from typing import Any, NamedTuple
+import numpy as np
+import torch as th
+from gymnasium import spaces
+from stable_baselines3.common.buffers import NStepReplayBuffer, ReplayBuffer
+from stable_baselines3.common.vec_env import VecNormalize
+
+
+class SumTree:
+    """Árbol de sumas sobre un arreglo plano (heap 1-indexado).
+
+    - Nodo raíz en 1; hijos de i en 2i y 2i+1; hojas en [cap, 2*cap).
+    - Actualización y muestreo por LOTES: se recorre el árbol nivel por nivel
+      con operaciones numpy sobre todo el lote (O(B·log N), sin bucles por item).
+    """
+    def __init__(self, capacidad: int):
+        assert capacidad > 0, "La capacidad del SumTree debe ser positiva"
+        self.capacidad = int(capacidad)
+        # Capacidad interna potencia de 2 => todas las hojas a la misma profundidad
+        self.cap = 1 << int(np.ceil(np.log2(max(2, self.capacidad))))
+        self.profundidad = int(np.log2(self.cap))
+        self.tree = np.zeros(2 * self.cap, dtype=np.float64)
+
+    @property
+    def total(self) -> float:
+        return float(self.tree[1])
+
+    def get(self, indices: np.ndarray) -> np.ndarray:
+        """Prioridades guardadas en las hojas 'indices'."""
+        return self.tree[np.asarray(indices, dtype=np.int64) + self.cap]
+
+    def update(self, indices: np.ndarray, prioridades: np.ndarray) -> None:
+        """Escribe prioridades en hojas y propaga las sumas hacia la raíz (vectorizado)."""
+        nodos = np.asarray(indices, dtype=np.int64).ravel() + self.cap
+        self.tree[nodos] = np.asarray(prioridades, dtype=np.float64).ravel()
+        for _ in range(self.profundidad):
+            nodos = np.unique(nodos >> 1)
+            self.tree[nodos] = self.tree[2 * nodos] + self.tree[2 * nodos + 1]
+
+    def find(self, valores: np.ndarray) -> np.ndarray:
+        """Para cada valor en [0, total) devuelve la hoja cuya suma prefija lo contiene."""
+        u = np.asarray(valores, dtype=np.float64).copy()
+        nodos = np.ones(u.shape, dtype=np.int64)
+        for _ in range(self.profundidad):
+            izq = 2 * nodos
+            v_izq = self.tree[izq]
+            derecha = u >= v_izq
+            u = np.where(derecha, u - v_izq, u)
+            nodos = izq + derecha
+        return nodos - self.cap
+
+    def sample(self, batch_size: int, rng: np.random.Generator | None = None) -> np.ndarray:
+        """Muestreo estratificado: un valor uniforme por cada segmento [k, k+1)·total/B.
+        Sin 'rng' se usa el np.random global (reproducible con set_seed)."""
+        rng = rng if rng is not None else np.random.default_rng(np.random.randint(2**31 - 1))
+        total = self.total
+        seg = total / batch_size
+        u = (np.arange(batch_size) + rng.random(batch_size)) * seg
+        # Evita caer exactamente en el borde derecho por redondeo
+        u = np.minimum(u, np.nextafter(total, 0.0))
+        return self.find(u)
+
+
+class PrioritizedReplayBufferSamples(NamedTuple):
+    observations: th.Tensor
+    actions: th.Tensor
+    next_observations: th.Tensor
+    dones: th.Tensor
+    rewards: th.Tensor
+    discounts: th.Tensor | None
+    weights: th.Tensor       # pesos de importance-sampling (N, 1)
+    indices: np.ndarray      # hojas del SumTree (para actualizar prioridades)
+
+
+class PrioritizedReplayBuffer(NStepReplayBuffer):
+    """Replay priorizado proporcional (Schaul et al., 2016) sobre el ReplayBuffer de SB3.
+
+    - Cada transición (pos, env) ocupa la hoja pos*n_envs + env del SumTree.
+    - Las nuevas transiciones entran con la prioridad máxima vista hasta ahora.
+    - P(i) = p_i^alpha / sum_k p_k^alpha ; w_i = (N·P(i))^-beta normalizado por el máximo del lote.
+    - 'seed' fija el generador del muestreo; si es None se toma del np.random global,
+      así set_seed(...) sigue controlando qué transiciones se muestrean.
+    - Con n_steps > 1 las muestras llevan retornos n-step y discounts = gamma^k, calculados
+      por NStepReplayBuffer._get_samples de SB3 (requiere n_envs=1: SB3 elige el env al azar).
+    """
+    def __init__(
+        self,
+        buffer_size: int,
+        observation_space: spaces.Space,
+        action_space: spaces.Space,
+        device: th.device | str = "auto",
+        n_envs: int = 1,
+        optimize_memory_usage: bool = False,
+        handle_timeout_termination: bool = True,
+        alpha: float = 0.6,
+        beta: float = 0.4,
+        eps: float = 1e-6,
+        n_steps: int = 1,
+        gamma: float = 0.99,
+        seed: int | None = None,
+    ):
+        if optimize_memory_usage:
+            raise NotImplementedError("PrioritizedReplayBuffer no soporta optimize_memory_usage=True")
+        super().__init__(buffer_size, observation_space, action_space, device=device, n_envs=n_envs,
+                         optimize_memory_usage=optimize_memory_usage,
+                         handle_timeout_termination=handle_timeout_termination,
+                         n_steps=int(n_steps), gamma=float(gamma))
+        assert self.n_steps == 1 or self.n_envs == 1, "Replay priorizado n-step requiere n_envs=1"
+        self.alpha = float(alpha)
+        self.beta = float(beta)
+        self.eps = float(eps)
+        self.max_prioridad = 1.0
+        self.tree = SumTree(self.buffer_size * self.n_envs)
+        self._rng = np.random.default_rng(seed if seed is not None else np.random.randint(2**31 - 1))
+
+    def add(
+        self,
+        obs: np.ndarray,
+        next_obs: np.ndarray,
+        action: np.ndarray,
+        reward: np.ndarray,
+        done: np.ndarray,
+        infos: list[dict[str, Any]],
+    ) -> None:
+        hojas = self.pos * self.n_envs + np.arange(self.n_envs)
+        super().add(obs, next_obs, action, reward, done, infos)
+        self.tree.update(hojas, np.full(self.n_envs, self.max_prioridad ** self.alpha))
+
+    def sample(self, batch_size: int, env: VecNormalize | None = None) -> PrioritizedReplayBufferSamples:
+        n_validas = self.size() * self.n_envs
+        hojas = self.tree.sample(batch_size, self._rng)
+        hojas = np.minimum(hojas, n_validas - 1)  # salvaguarda numérica
+
+        # Pesos de importance-sampling
+        probs = self.tree.get(hojas) / self.tree.total
+        pesos = (n_validas * probs) ** (-self.beta)
+        pesos = (pesos / pesos.max()).astype(np.float32).reshape(-1, 1)
+
+        batch_inds = hojas // self.n_envs
+        env_inds = hojas % self.n_envs
+        muestras = self._get_samples_env(batch_inds, env_inds, env)
+        return PrioritizedReplayBufferSamples(*muestras, weights=self.to_torch(pesos), indices=hojas)
+
+    def _get_samples_env(self, batch_inds: np.ndarray, env_inds: np.ndarray,
+                         env: VecNormalize | None = None) -> tuple:
+        """Igual que ReplayBuffer._get_samples pero con env_inds fijados por el SumTree."""
+        if self.n_steps > 1:
+            # n_envs=1 => el env que elige SB3 coincide con env_inds (todos 0)
+            return tuple(super()._get_samples(batch_inds, env))
+        data = (
+            self._normalize_obs(self.observations[batch_inds, env_inds, :], env),
+            self.actions[batch_inds, env_inds, :],
+            self._normalize_obs(self.next_observations[batch_inds, env_inds, :], env),
+            # Solo dones que no son por timeout
+            (self.dones[batch_inds, env_inds] * (1 - self.timeouts[batch_inds, env_inds])).reshape(-1, 1),
+            self._normalize_reward(self.rewards[batch_inds, env_inds].reshape(-1, 1), env),
+        )
+        return (*tuple(map(self.to_torch, data)), None)
+
+    def update_priorities(self, indices: np.ndarray, td_errors: np.ndarray) -> None:
+        """Actualiza prioridades de un lote con |TD| + eps."""
+        prioridades = np.abs(np.asarray(td_errors, dtype=np.float64).ravel()) + self.eps
+        self.max_prioridad = max(self.max_prioridad, float(prioridades.max()))
+        self.tree.update(indices, prioridades ** self.alpha)
+
+
+def agregar_lote(buffer: ReplayBuffer, obs: np.ndarray, next_obs: np.ndarray, actions: np.ndarray,
+                 rewards: np.ndarray, dones: np.ndarray, timeouts: np.ndarray) -> None:
+    """Escribe n transiciones de UN entorno (buffer con n_envs=1) como rebanadas contiguas,
+    en vez de n llamadas a buffer.add. Respeta el índice circular (pos/full) de SB3 y, si el
+    buffer es priorizado, inserta las nuevas hojas con la prioridad máxima."""
+    assert buffer.n_envs == 1 and not buffer.optimize_memory_usage, "agregar_lote requiere n_envs=1"
+    n = len(rewards)
+    assert n <= buffer.buffer_size, "El lote no puede superar el tamaño del buffer"
+    pos = (buffer.pos + np.arange(n)) % buffer.buffer_size
+    buffer.observations[pos, 0] = obs.reshape((n, *buffer.obs_shape))
+    buffer.next_observations[pos, 0] = next_obs.reshape((n, *buffer.obs_shape))
+    buffer.actions[pos, 0] = np.asarray(actions).reshape((n, buffer.action_dim))
+    buffer.rewards[pos, 0] = rewards
+    buffer.dones[pos, 0] = dones
+    if buffer.handle_timeout_termination:
+        buffer.timeouts[pos, 0] = timeouts
+    if isinstance(buffer, PrioritizedReplayBuffer):
+        buffer.tree.update(pos, np.full(n, buffer.max_prioridad ** buffer.alpha))
+    buffer.full = buffer.full or buffer.pos + n >= buffer.buffer_size
+    buffer.pos = int((buffer.pos + n) % buffer.buffer_size)
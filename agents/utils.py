@@ -13,4 +13,23 @@ def set_seed(seed: int = 42):
         torch.cuda.manual_seed_all(seed)
 
 def ensure_dir(path: str):
-    os.makedirs(path, exist_ok=True)
\ No newline at end of file
+    os.makedirs(path, exist_ok=True)
+
+def resumen_entrenamiento(ep_returns: list, ep_lengths: list, exitos: int, choques: int,
+                          duracion: float, pasos: int) -> dict:
+    """Resumen común de entrenamiento (single-process y actor–learner)."""
+    R = np.array(ep_returns, dtype=float)
+    L = np.array(ep_lengths, dtype=int)
+    return {
+        "episodios": int(len(R)),
+        "retorno_prom": float(R.mean()),
+        "retorno_std": float(R.std()),
+        "retorno_mejor": float(R.max()),
+        "largo_prom": float(L.mean()),
+        "exitos": int(exitos),
+        "choques": int(choques),
+        "tasa_exito": float(exitos / len(R)),
+        "tiempo_total": float(duracion),
+        "pasos_totales": int(pasos),
+        "pasos_por_seg": float(pasos / duracion) if duracion > 0 else 0.0,
+    }
@@ -2,6 +2,8 @@
 from __future__ import annotations
 import numpy as np
 import csv
+import hashlib
+import os
 from dataclasses import dataclass
 
 # Definiciones de casillas:
@@ -111,3 +113,51 @@ class GridTrack:
         # Centro = rear_x + car_largo_x/2
         x_c = float(col) + car_largo_x / 2.0
         return x_c, y_c
+
+    def spawns_validos(self, car_largo_x: float, car_alto_y: float) -> np.ndarray:
+        """Índice de colocaciones válidas del coche, (N, 2) con centros (x, y):
+        - Trasera alineada a celda (x = xi + largo/2) y y entero como en la salida oficial.
+        - Sin tocar MURO ni META (misma ventana inclusiva que rect_toca_muro/rect_toca_meta).
+        - Ninguna celda bajo el coche es AFUERAS (sobre la pista).
+        Vectorizado con tablas de sumas acumuladas (integral image)."""
+        L, H = int(car_largo_x), int(car_alto_y)
+        assert L == car_largo_x and H == car_alto_y, "Las dimensiones del coche deben ser enteras"
+        nx, ny = self.ancho - L + 1, self.alto - H + 1
+        if nx <= 0 or ny <= 0:
+            return np.zeros((0, 2), dtype=np.float32)
+
+        def sumas(mask: np.ndarray, h: int, w: int) -> np.ndarray:
+            # Fila/columna extra de ceros: fuera del grid no es muro/meta/afueras
+            M = np.zeros((self.alto + 1, self.ancho + 1), dtype=np.int32)
+            M[:-1, :-1] = mask
+            S = np.zeros((self.alto + 2, self.ancho + 2), dtype=np.int32)
+            S[1:, 1:] = M.cumsum(0).cumsum(1)  # S[i, j] = suma de M[:i, :j]
+            return S[h:h + ny, w:w + nx] - S[:ny, w:w + nx] - S[h:h + ny, :nx] + S[:ny, :nx]
+
+        bloqueado = sumas(self.grid == TILE_MURO, H + 1, L + 1) + sumas(self.grid == TILE_META, H + 1, L + 1)
+        fuera = sumas(self.grid == TILE_AFUERAS, H, L)
+        ys, xs = np.nonzero((bloqueado == 0) & (fuera == 0))
+        return np.stack([xs + L / 2.0, ys + H / 2.0], axis=1).astype(np.float32)
+
+
+def indice_spawns_cacheado(ruta_csv: str, track: GridTrack,
+                           car_largo_x: float, car_alto_y: float) -> np.ndarray:
+    """Carga (o construye y guarda) el índice de spawns junto al CSV: '<pista>.spawns.npz'.
+    La caché se invalida si cambian el grid o las dimensiones del coche."""
+    ruta_cache = os.path.splitext(ruta_csv)[0] + ".spawns.npz"
+    firma = hashlib.sha1(track.grid.tobytes() + f"{car_largo_x}x{car_alto_y}".encode()).hexdigest()
+    if os.path.exists(ruta_cache):
+        with np.load(ruta_cache) as data:
+            if str(data["firma"]) == firma:
+                return data["spawns"]
+    spawns = track.spawns_validos(car_largo_x, car_alto_y)
+    try:
+        # Escritura atómica: varios procesos (actores) pueden construir la misma caché
+        tmp = f"{ruta_cache}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            np.savez(f, spawns=spawns, firma=np.array(firma))
+        os.replace(tmp, ruta_cache)
+    except OSError:
+        pass  # directorio de pistas de solo lectura: se usa el índice en memoria
+    return spawns
+
@@ -0,0 +1,133 @@
+# envs/paso_numba.py
+from __future__ import annotations
+import numpy as np
+from .grid_track import TILE_MURO, TILE_AFUERAS, TILE_ACEITE, TILE_TERRACERIA, TILE_BOOST, TILE_META
+
+# Backend opcional: un único kernel compilado con numba que fusiona dinámica, superficies,
+# recorte a bordes, colisión, recompensa y escritura del patch. Replica EXACTAMENTE las
+# operaciones de DinamicaCoche.actualizar, GridTrack.rect_toca_*, Recompensa.paso y
+# patch_egocentrico (dir=0), en el mismo orden, para obtener resultados bit a bit iguales.
+try:
+    import numba
+    NUMBA_DISPONIBLE = True
+    _njit = numba.njit(cache=True)
+except ImportError:
+    numba = None
+    NUMBA_DISPONIBLE = False
+    _njit = lambda f: f  # noqa: E731  (sin numba las funciones quedan en Python puro)
+
+@_njit
+def _tile_en(grid, y, x):
+    if y < 0 or y >= grid.shape[0] or x < 0 or x >= grid.shape[1]:
+        return TILE_AFUERAS
+    return grid[y, x]
+
+@_njit
+def _rect_toca(grid, tile, x_min, y_min, x_max, y_max):
+    xi0 = int(np.floor(x_min))
+    yi0 = int(np.floor(y_min))
+    xi1 = int(np.ceil(x_max))
+    yi1 = int(np.ceil(y_max))
+    for yi in range(yi0, yi1 + 1):
+        for xi in range(xi0, xi1 + 1):
+            if _tile_en(grid, yi, xi) == tile:
+                return True
+    return False
+
+@_njit
+def _dist_a_meta(centros, x, y, dos, mitad):
+    # 'dos' y 'mitad' llegan en tiempo de ejecución: con exponentes constantes LLVM reemplaza
+    # pow(d, 0.5) por sqrt(d), que NO siempre coincide con el pow de libm que usa CPython.
+    if centros.shape[0] == 0:
+        return 0.0
+    dmin = 1e9
+    for k in range(centros.shape[0]):
+        d = ((x - centros[k, 0]) ** dos + (y - centros[k, 1]) ** dos) ** mitad
+        if d < dmin:
+            dmin = d
+    return dmin
+
+@_njit
+def patch_onehot(grid, x_c, y_c, alto, ancho, back_margin):
+    """patch_egocentrico con dir=0 (Este) escrito directamente en one-hot (H, W, 8)."""
+    oh = np.zeros((alto, ancho, 8), dtype=np.float32)
+    for i in range(alto):
+        forward = i - back_margin
+        for j in range(ancho):
+            lateral = j - (ancho // 2)
+            xi = int(np.floor(x_c + forward))
+            yi = int(np.floor(y_c + lateral))
+            t = _tile_en(grid, yi, xi)
+            if 0 <= t < 8:
+                oh[i, j, t] = 1.0
+    return oh
+
+@_njit
+def paso_fusionado(grid, centros, x, y, v, boost_contador, accion,
+                   v_max, acel, freno, escala_tiempo, car_largo_x, car_alto_y,
+                   k_progreso, k_tiempo, r_choque, r_meta, dist_inicial, dist_prev,
+                   patch_h, patch_w, back_margin, escribir_patch, dos, mitad):
+    """Un paso completo de RacingEnv. Devuelve
+    (x, y, v, boost_contador, r, dist_act, choco, llego_meta, obs_patch).
+    'dos'/'mitad' (2.0 y 0.5) son los exponentes de la distancia euclídea (ver _dist_a_meta);
+    sin valores por defecto: los argumentos omitidos hacen lento el despacho de numba."""
+    alto, ancho = grid.shape
+    steer_idx = accion % 3
+    throttle_idx = accion // 3
+
+    # Tile bajo el centro
+    tile_y = int(min(max(np.floor(y), 0), alto - 1))
+    tile_x = int(min(max(np.floor(x), 0), ancho - 1))
+    tile_bajo = _tile_en(grid, tile_y, tile_x)
+
+    # Dinámica (DinamicaCoche.actualizar)
+    if throttle_idx == 2:
+        v = min(v_max, v + acel * escala_tiempo)
+    elif throttle_idx == 0:
+        v = max(0.0, v - freno * escala_tiempo)
+    if boost_contador > 0:
+        v = min(v_max, v * (1.05 ** escala_tiempo))
+        boost_contador -= 1
+    if tile_bajo == TILE_ACEITE:
+        v *= 0.90
+    elif tile_bajo == TILE_TERRACERIA:
+        v *= 0.95
+    if tile_bajo == TILE_BOOST:
+        boost_contador = max(boost_contador, 10)
+    x_new = x + v * escala_tiempo
+    if steer_idx == 0:
+        y_new = y - 1.0
+    elif steer_idx == 2:
+        y_new = y + 1.0
+    else:
+        y_new = y
+
+    # Recorte a bordes (np.clip)
+    y_lo, y_hi = 0.0 + car_alto_y / 2.0, alto - car_alto_y / 2.0
+    y_new = min(max(y_new, y_lo), y_hi)
+    x_lo, x_hi = 0.0 + car_largo_x / 2.0, ancho - car_largo_x / 2.0
+    x_new = min(max(x_new, x_lo), x_hi)
+
+    # Colisión / meta con AABB fijo
+    x_min = x_new - car_largo_x / 2.0
+    x_max = x_new + car_largo_x / 2.0
+    y_min = y_new - car_alto_y / 2.0
+    y_max = y_new + car_alto_y / 2.0
+    choco = _rect_toca(grid, TILE_MURO, x_min, y_min, x_max, y_max)
+    llego_meta = _rect_toca(grid, TILE_META, x_min, y_min, x_max, y_max)
+
+    # Recompensa (Recompensa.paso)
+    dist_act = _dist_a_meta(centros, x_new, y_new, dos, mitad)
+    delta = (dist_prev - dist_act) / dist_inicial
+    r = k_progreso * delta
+    r -= k_tiempo
+    if choco:
+        r -= r_choque
+    if llego_meta:
+        r += r_meta
+
+    if escribir_patch:
+        obs = patch_onehot(grid, x_new, y_new, patch_h, patch_w, back_margin)
+    else:
+        obs = np.zeros((0, 0, 8), dtype=np.float32)
+    return x_new, y_new, v, boost_contador, r, dist_act, choco, llego_meta, obs
@@ -1,25 +1,34 @@
 # envs/racing_env.py
 from __future__ import annotations
+import warnings
 import numpy as np
 import gymnasium as gym
 from gymnasium import spaces
 
-from .grid_track import GridTrack, TILE_MURO
+from .grid_track import GridTrack, TILE_MURO, indice_spawns_cacheado
 from .dynamics import DinamicaCoche
-from .sensors import patch_egocentrico
+from .sensors import patch_egocentrico, distancias_direccionales, rayos_distancia, TILES_RAYO, RAYOS_LOCALES
 from .rewards import Recompensa
 from .renderer import Renderer
+from .paso_numba import NUMBA_DISPONIBLE, paso_fusionado
 
 class RacingEnv(gym.Env):
     """Entorno de carrera con orientación fija al ESTE (+X) y progreso normalizado hacia meta."""
     metadata = {"render_modes": ["human", "rgb_array"]}
 
     def __init__(self, ruta_csv: str, patch_h: int = 11, patch_w: int = 11,
-                 render_mode: str | None = None, renderer_ppu: int = 36, render_fps: int = 60):
+                 render_mode: str | None = None, renderer_ppu: int = 36, render_fps: int = 60,
+                 observacion: str = "patch", n_rayos: int = 5, rayo_max: int = 16,
+                 reset_modo: str = "salida", ancho_seccion: int = 4, backend: str = "python"):
         super().__init__()
         self.track = GridTrack.from_csv(ruta_csv)
         self.patch_h = int(patch_h)
         self.patch_w = int(patch_w)
+        assert observacion in ("patch", "rayos"), "observacion debe ser 'patch' o 'rayos'"
+        self.observacion = observacion
+        assert 1 <= n_rayos <= len(RAYOS_LOCALES), f"n_rayos debe estar en 1..{len(RAYOS_LOCALES)}"
+        self.n_rayos = int(n_rayos)
+        self.rayo_max = int(rayo_max)
         self.render_mode = render_mode
 
         # Dimensiones físicas del coche (en unidades de grid)
@@ -35,10 +44,17 @@ class RacingEnv(gym.Env):
         self.dyn = DinamicaCoche(v_max=2.0, aceleracion=0.2, frenado=0.3)
         self.rew = Recompensa(k_progreso=1.0, k_tiempo=0.01, r_choque=5.0, r_meta=20.0)
 
-        # Observación H×W×C (C=8 con S y M). El patch sigue “mirando” al Este.
-        self.observation_space = spaces.Box(
-            low=0.0, high=1.0, shape=(self.patch_h, self.patch_w, 8), dtype=np.float32
-        )
+        if self.observacion == "rayos":
+            # Rayos: distancias (n_rayos × superficies) + velocidad; transformadas precalculadas
+            self._dist_dir = distancias_direccionales(self.track, max_dist=self.rayo_max)
+            self.observation_space = spaces.Box(
+                low=0.0, high=1.0, shape=(self.n_rayos * len(TILES_RAYO) + 1,), dtype=np.float32
+            )
+        else:
+            # Observación H×W×C (C=8 con S y M). El patch sigue “mirando” al Este.
+            self.observation_space = spaces.Box(
+                low=0.0, high=1.0, shape=(self.patch_h, self.patch_w, 8), dtype=np.float32
+            )
         # Acción: (steer × throttle) = 3×3 = 9
         self.action_space = spaces.Discrete(9)
 
@@ -51,6 +67,27 @@ class RacingEnv(gym.Env):
         self._dist_init = 1.0
         self._dist_prev = 1.0
 
+        # Backend de step: "python" (métodos separados) o "numba" (kernel fusionado, mismos resultados)
+        assert backend in ("python", "numba"), "backend debe ser 'python' o 'numba'"
+        if backend == "numba" and not NUMBA_DISPONIBLE:
+            warnings.warn("numba no está instalado; RacingEnv usa el backend 'python'")
+            backend = "python"
+        self.backend = backend
+        self._centros_arr = np.array(self._centros_meta, dtype=np.float64).reshape(-1, 2)
+
+        # Reset: "salida" (casillas S), "uniforme" o "fallos" (spawns del índice precalculado)
+        assert reset_modo in ("salida", "uniforme", "fallos"), "reset_modo inválido"
+        self.reset_modo = reset_modo
+        self.ancho_seccion = int(max(1, ancho_seccion))
+        self._spawns = None
+        self._fallos = None
+        if self.reset_modo != "salida":
+            self._spawns = indice_spawns_cacheado(ruta_csv, self.track, self.CAR_LARGO_X, self.CAR_ALTO_Y)
+            assert len(self._spawns) > 0, "La pista no tiene colocaciones válidas para el coche"
+            self._seccion_spawn = (self._spawns[:, 0] // self.ancho_seccion).astype(np.int64)
+            # Choques por sección de columnas (para muestrear cerca de donde se falla)
+            self._fallos = np.zeros(self.track.ancho // self.ancho_seccion + 1, dtype=np.float64)
+
     def _accion_a_tuplas(self, a: int) -> tuple[int, int]:
         steer_idx = a % 3       # 0=izq, 1=recto, 2=der
         throttle_idx = a // 3   # 0=frenar, 1=neutro, 2=acelerar
@@ -66,23 +103,50 @@ class RacingEnv(gym.Env):
                 dmin = d
         return float(dmin)
 
+    def _observar(self) -> np.ndarray:
+        """Observación según el sensor elegido (heading fijo al Este => dir=0)."""
+        if self.observacion == "rayos":
+            return rayos_distancia(self._dist_dir, self.x, self.y, self.v, self.dyn.v_max,
+                                   dir_card=0, n_rayos=self.n_rayos, max_dist=self.rayo_max)
+        return patch_egocentrico(self.track, self.x, self.y, dir_card=0,
+                                 ancho=self.patch_w, alto=self.patch_h, back_margin=3)
+
+    def _spawn_aleatorio(self) -> tuple[float, float, float]:
+        """Muestrea (x, y, v) del índice de spawns: uniforme o ponderado por choques
+        en la sección del spawn y la siguiente (hacia donde avanza el coche)."""
+        if self.reset_modo == "fallos":
+            sec = self._seccion_spawn
+            sig = np.minimum(sec + 1, len(self._fallos) - 1)
+            w = 1.0 + self._fallos[sec] + self._fallos[sig]
+            i = int(self.np_random.choice(len(self._spawns), p=w / w.sum()))
+        else:
+            i = int(self.np_random.integers(len(self._spawns)))
+        x, y = self._spawns[i]
+        v = float(self.np_random.uniform(0.0, self.dyn.v_max))
+        return float(x), float(y), v
+
     def reset(self, seed: int | None = None, options: dict | None = None):
         super().reset(seed=seed)
+        options = options or {}
         # Coloca el coche en la salida (mirando al Este)
-        self.x, self.y = self.track.spawn_desde_salida(self.CAR_LARGO_X, self.CAR_ALTO_Y)
-        self.v = 0.0
-
-        # Progreso normalizado
-        self._dist_init = self._dist_a_meta(self.x, self.y)
-        self._dist_prev = self._dist_init
+        x_s, y_s = self.track.spawn_desde_salida(self.CAR_LARGO_X, self.CAR_ALTO_Y)
+        if self.reset_modo == "salida" or options.get("salida_oficial", False):
+            self.x, self.y, self.v = x_s, y_s, 0.0
+        else:
+            self.x, self.y, self.v = self._spawn_aleatorio()
+
+        # Progreso normalizado (siempre respecto a la salida oficial => misma escala de recompensa)
+        self._dist_init = self._dist_a_meta(x_s, y_s)
+        self._dist_prev = self._dist_a_meta(self.x, self.y)
         self.rew.set_dist_inicial(self._dist_init)
 
         # Observación inicial (egocéntrica con “heading” fijo al Este => dir=0)
-        obs = patch_egocentrico(self.track, self.x, self.y, dir_card=0,
-                                ancho=self.patch_w, alto=self.patch_h, back_margin=3)
+        obs = self._observar()
         return obs, {}
 
     def step(self, action: int):
+        if self.backend == "numba":
+            return self._step_numba(action)
         steer_idx, throttle_idx = self._accion_a_tuplas(action)
 
         # Tile bajo el centro (para dinámica)
@@ -116,13 +180,14 @@ class RacingEnv(gym.Env):
         dist_act = self._dist_a_meta(x_new, y_new)
         r = self.rew.paso(self._dist_prev, dist_act, choco, llego_meta)
         self._dist_prev = dist_act
+        if choco and self._fallos is not None:
+            self._fallos[int(x_new // self.ancho_seccion)] += 1.0
 
         # Aplicar transición
         self.x, self.y, self.v = x_new, y_new, v_new
 
         # Observación egocéntrica con “heading” fijo al Este (dir=0)
-        obs = patch_egocentrico(self.track, self.x, self.y, dir_card=0,
-                                ancho=self.patch_w, alto=self.patch_h, back_margin=3)
+        obs = self._observar()
 
         terminated = bool(choco or llego_meta)
         truncated = False
@@ -132,6 +197,32 @@ class RacingEnv(gym.Env):
             self.render()
         return obs, r, terminated, truncated, info
 
+    def _step_numba(self, action: int):
+        """Mismo contrato que step(), con dinámica/recompensa/patch en un solo kernel."""
+        es_patch = self.observacion == "patch"
+        (x_new, y_new, v_new, boost, r, dist_act, choco, llego_meta, patch) = paso_fusionado(
+            self.track.grid, self._centros_arr, self.x, self.y, self.v, self.dyn.boost_contador, int(action),
+            self.dyn.v_max, self.dyn.acel, self.dyn.freno, self.dyn.escala_tiempo,
+            self.CAR_LARGO_X, self.CAR_ALTO_Y,
+            self.rew.k_progreso, self.rew.k_tiempo, self.rew.r_choque, self.rew.r_meta,
+            self.rew.dist_inicial, self._dist_prev,
+            self.patch_h, self.patch_w, 3, es_patch, 2.0, 0.5,
+        )
+        self.dyn.boost_contador = int(boost)
+        self._dist_prev = float(dist_act)
+        if choco and self._fallos is not None:
+            self._fallos[int(x_new // self.ancho_seccion)] += 1.0
+        self.x, self.y, self.v = float(x_new), float(y_new), float(v_new)
+        obs = patch if es_patch else self._observar()
+
+        terminated = bool(choco or llego_meta)
+        truncated = False
+        info = {"velocidad": self.v, "meta": bool(llego_meta), "choque": bool(choco)}
+
+        if self.render_mode == "human" and self.renderer is not None:
+            self.render()
+        return obs, float(r), terminated, truncated, info
+
     def set_visual_speed_scale(self, escala: float):
         """Ralentiza/acelera la animación (no afecta aprendizaje)."""
         self.dyn.escala_tiempo = float(max(0.05, escala))
@@ -1,7 +1,9 @@
 # envs/sensors.py
 from __future__ import annotations
 import numpy as np
-from .grid_track import GridTrack, TILE_AFUERAS
+from .grid_track import (
+    GridTrack, TILE_AFUERAS, TILE_MURO, TILE_ACEITE, TILE_TERRACERIA, TILE_BOOST, TILE_META
+)
 
 # 0=E, 1=S, 2=O, 3=N
 def _rotar_local_a_mundo(forward: int, lateral: int, dir_card: int) -> tuple[int, int]:
@@ -37,3 +39,60 @@ def patch_egocentrico(track: GridTrack, x_c: float, y_c: float,
     for c in range(C):
         oh[c] = (patch == c).astype(np.float32)
     return np.transpose(oh, (1, 2, 0)).astype(np.float32)  # (H, W, C)
+
+
+# Direcciones locales (forward, lateral) de los rayos, en orden de prioridad:
+# frente, frente-izq, frente-der, izq, der, atrás-izq, atrás-der, atrás
+RAYOS_LOCALES = [(1, 0), (1, -1), (1, 1), (0, -1), (0, 1), (-1, -1), (-1, 1), (-1, 0)]
+# Direcciones de mundo (dx, dy) indexadas en las transformadas de distancia
+DIRS_MUNDO = [(1, 0), (1, 1), (0, 1), (-1, 1), (-1, 0), (-1, -1), (0, -1), (1, -1)]
+# Superficies a las que mide distancia cada rayo
+TILES_RAYO = (TILE_MURO, TILE_ACEITE, TILE_TERRACERIA, TILE_BOOST, TILE_META)
+
+def distancias_direccionales(track: GridTrack, max_dist: int = 16) -> np.ndarray:
+    """Transformadas de distancia por dirección: D[d, k, y, x] = nº de celdas desde (y,x)
+    avanzando en DIRS_MUNDO[d] hasta la primera celda de TILES_RAYO[k] (0 si está encima),
+    saturada en 'max_dist'. Fuera del grid cuenta como 'no encontrado'.
+    Se calcula barriendo columnas (o filas) en sentido contrario al rayo: D = 1 + D(vecino)."""
+    grid = track.grid
+    alto, ancho = grid.shape
+    es_tile = np.stack([grid == t for t in TILES_RAYO])  # (K, H, W)
+    D = np.full((len(DIRS_MUNDO), len(TILES_RAYO), alto, ancho), max_dist, dtype=np.int32)
+    for d, (dx, dy) in enumerate(DIRS_MUNDO):
+        Dd = D[d]
+        if dx != 0:
+            cols = range(ancho - 1, -1, -1) if dx > 0 else range(ancho)
+            for x in cols:
+                xv = x + dx
+                sig = np.full((len(TILES_RAYO), alto), max_dist, dtype=np.int32)
+                if 0 <= xv < ancho:
+                    # Vecino en (y+dy, xv); filas fuera del grid quedan en max_dist
+                    if dy > 0:
+                        sig[:, :-dy] = Dd[:, dy:, xv]
+                    elif dy < 0:
+                        sig[:, -dy:] = Dd[:, :dy, xv]
+                    else:
+                        sig[:] = Dd[:, :, xv]
+                Dd[:, :, x] = np.where(es_tile[:, :, x], 0, np.minimum(sig + 1, max_dist))
+        else:
+            filas = range(alto - 1, -1, -1) if dy > 0 else range(alto)
+            for y in filas:
+                yv = y + dy
+                sig = Dd[:, yv, :] if 0 <= yv < alto else np.full((len(TILES_RAYO), ancho), max_dist, dtype=np.int32)
+                Dd[:, y, :] = np.where(es_tile[:, y, :], 0, np.minimum(sig + 1, max_dist))
+    return D
+
+def rayos_distancia(dist_dir: np.ndarray, x_c: float, y_c: float, v: float, v_max: float,
+                    dir_card: int, n_rayos: int = 5, max_dist: int = 16) -> np.ndarray:
+    """Sensor compacto: 'n_rayos' rayos desde el centro del coche orientados por 'dir_card'.
+    Cada rayo es UNA consulta a 'dist_dir' (ver distancias_direccionales).
+    Devuelve float32 de tamaño n_rayos*len(TILES_RAYO) + 1 en [0, 1]:
+    distancias normalizadas por max_dist (rayo-major) y al final la velocidad / v_max."""
+    _, _, alto, ancho = dist_dir.shape
+    xi = min(max(int(np.floor(x_c)), 0), ancho - 1)
+    yi = min(max(int(np.floor(y_c)), 0), alto - 1)
+    idx = [DIRS_MUNDO.index(_rotar_local_a_mundo(f, l, dir_card)) for f, l in RAYOS_LOCALES[:n_rayos]]
+    obs = np.empty(n_rayos * len(TILES_RAYO) + 1, dtype=np.float32)
+    obs[:-1] = dist_dir[idx, :, yi, xi].ravel() / float(max_dist)
+    obs[-1] = v / v_max
+    return obs
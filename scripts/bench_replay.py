@@ -0,0 +1,40 @@
+# scripts/bench_replay.py
+from __future__ import annotations
+import argparse
+import time
+import numpy as np
+from agents.replay import SumTree
+
+def medir(n: int, batch: int, repeticiones: int, rng: np.random.Generator) -> tuple[float, float]:
+    """Devuelve (us por sample, us por update) de un lote en un SumTree lleno de tamaño n."""
+    tree = SumTree(n)
+    tree.update(np.arange(n), rng.random(n) + 1e-3)
+
+    t0 = time.perf_counter()
+    for _ in range(repeticiones):
+        hojas = tree.sample(batch, rng)
+    t_sample = (time.perf_counter() - t0) / repeticiones
+
+    t0 = time.perf_counter()
+    for _ in range(repeticiones):
+        tree.update(hojas, rng.random(batch) + 1e-3)
+    t_update = (time.perf_counter() - t0) / repeticiones
+    return t_sample * 1e6, t_update * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del SumTree del replay priorizado")
+    parser.add_argument("--batch", type=int, default=64)
+    parser.add_argument("--repeticiones", type=int, default=500)
+    parser.add_argument("--log2-min", type=int, default=10)
+    parser.add_argument("--log2-max", type=int, default=21, help="2^21 ≈ 2M entradas")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'N':>10} | {'log2N':>5} | {'sample (us)':>11} | {'update (us)':>11} | {'sample/log2N':>12}")
+    for k in range(args.log2_min, args.log2_max + 1):
+        n = 1 << k
+        t_s, t_u = medir(n, args.batch, args.repeticiones, rng)
+        print(f"{n:>10} | {k:>5} | {t_s:>11.1f} | {t_u:>11.1f} | {t_s / k:>12.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+# scripts/bench_step.py
+from __future__ import annotations
+import argparse
+import time
+import numpy as np
+from envs.racing_env import RacingEnv
+from envs.paso_numba import NUMBA_DISPONIBLE
+
+def trayectoria(env: RacingEnv, acciones: np.ndarray, seed: int) -> list:
+    """Ejecuta 'acciones' (reseteando al terminar) y devuelve todas las salidas de step."""
+    salidas = []
+    env.reset(seed=seed)
+    for a in acciones:
+        obs, r, term, trunc, info = env.step(int(a))
+        salidas.append((obs, r, term, info["velocidad"], env.x, env.y))
+        if term or trunc:
+            env.reset()
+    return salidas
+
+def iguales(a: list, b: list) -> bool:
+    """Comparación bit a bit (no aproximada) de dos trayectorias."""
+    if len(a) != len(b):
+        return False
+    for (o1, r1, t1, v1, x1, y1), (o2, r2, t2, v2, x2, y2) in zip(a, b):
+        if not np.array_equal(o1, o2) or o1.dtype != o2.dtype:
+            return False
+        if np.float64(r1).tobytes() != np.float64(r2).tobytes() or t1 != t2:
+            return False
+        if (v1, x1, y1) != (v2, x2, y2):
+            return False
+    return True
+
+def latencia_us(env: RacingEnv, acciones: np.ndarray, seed: int) -> float:
+    env.reset(seed=seed)
+    t0 = time.perf_counter()
+    for a in acciones:
+        _, _, term, trunc, _ = env.step(int(a))
+        if term or trunc:
+            env.reset()
+    return (time.perf_counter() - t0) / len(acciones) * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description="Latencia por step: backend python vs numba")
+    parser.add_argument("--csv", type=str, nargs="+", default=["tracks/track01.csv", "tracks/track03.csv"])
+    parser.add_argument("--pasos", type=int, default=5000)
+    parser.add_argument("--observacion", type=str, default="patch", choices=["patch", "rayos"])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if not NUMBA_DISPONIBLE:
+        print("numba no está instalado: solo existe el backend 'python'.")
+        return
+
+    rng = np.random.default_rng(args.seed)
+    acciones = rng.integers(0, 9, size=args.pasos)
+    print(f"{'pista':<22} | {'python (us)':>11} | {'numba (us)':>10} | {'speedup':>7} | bit-identico")
+    for ruta in args.csv:
+        # reset uniforme => visita toda la pista, no solo el primer tramo
+        kw = dict(ruta_csv=ruta, observacion=args.observacion, reset_modo="uniforme")
+        env_py = RacingEnv(backend="python", **kw)
+        env_nb = RacingEnv(backend="numba", **kw)
+        ok = iguales(trayectoria(env_py, acciones, args.seed), trayectoria(env_nb, acciones, args.seed))
+        t_py = latencia_us(env_py, acciones, args.seed)
+        t_nb = latencia_us(env_nb, acciones, args.seed)
+        print(f"{ruta:<22} | {t_py:>11.1f} | {t_nb:>10.1f} | {t_py / t_nb:>6.1f}x | {ok}")
+
+if __name__ == "__main__":
+    main()
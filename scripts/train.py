@@ -4,15 +4,18 @@ import argparse
 import time 
 from stable_baselines3.common.monitor import Monitor
 from stable_baselines3.common.callbacks import BaseCallback, CallbackList
-from agents.utils import set_seed, ensure_dir
+from agents.utils import set_seed, ensure_dir, resumen_entrenamiento
 from envs.racing_env import RacingEnv
 from agents.dqn_agent import crear_dqn
+from agents.apex import entrenar_apex
 
 class RenderPreviewCallback(BaseCallback):
     def __init__(self, ruta_csv: str, every_n_steps: int = 5000,
-                 ppu: int = 36, fps: int = 24, speed_scale: float = 0.7):
+                 ppu: int = 36, fps: int = 24, speed_scale: float = 0.7,
+                 env_kwargs: dict | None = None):
         super().__init__()
         self.ruta_csv = ruta_csv
+        self.env_kwargs = dict(env_kwargs or {})
         self.every_n_steps = max(1, every_n_steps)
         self.ppu = ppu
         self.fps = fps
@@ -20,9 +23,9 @@ class RenderPreviewCallback(BaseCallback):
 
     def _on_step(self) -> bool:
         if self.n_calls % self.every_n_steps == 0:
-            env = RacingEnv(ruta_csv=args.csv, patch_h=11, patch_w=11, render_mode=None)
+            env = RacingEnv(ruta_csv=self.ruta_csv, render_mode=None, **self.env_kwargs)
             env.set_visual_speed_scale(self.speed_scale)
-            obs, _ = env.reset()
+            obs, _ = env.reset(options={"salida_oficial": True})
             done, trunc = False, False
             while not (done or trunc):
                 action, _ = self.model.predict(obs, deterministic=True)
@@ -74,27 +77,18 @@ class StatsCallback(BaseCallback):
                 print(f"Tiempo total de entrenamiento: {dur:.2f} s")
             return
 
-        import numpy as np
-        R = np.array(self.ep_returns, dtype=float)
-        L = np.array(self.ep_lengths, dtype=int)
         dur = 0.0
         if self.start_time is not None and self.end_time is not None:
             dur = self.end_time - self.start_time
 
-        resumen = {
-            "episodios": int(len(R)),
-            "retorno_prom": float(R.mean()),
-            "retorno_std": float(R.std()),
-            "retorno_mejor": float(R.max()),
-            "largo_prom": float(L.mean()),
-            "exitos": int(self.successes),
-            "choques": int(self.crashes),
-            "tasa_exito": float(self.successes / len(R)),
-            "tiempo_total": float(dur),
-        }
-        print("\n=== Resumen de entrenamiento ===")
-        for k, v in resumen.items():
-            print(f"{k}: {v}")
+        resumen = resumen_entrenamiento(self.ep_returns, self.ep_lengths, self.successes,
+                                        self.crashes, dur, self.num_timesteps)
+        imprimir_resumen(resumen)
+
+def imprimir_resumen(resumen: dict) -> None:
+    print("\n=== Resumen de entrenamiento ===")
+    for k, v in resumen.items():
+        print(f"{k}: {v}")
 
 def main():
     parser = argparse.ArgumentParser(description="Entrenamiento DQN para pista CSV")
@@ -106,17 +100,56 @@ def main():
     parser.add_argument("--preview-ppu", type=int, default=36)
     parser.add_argument("--preview-fps", type=int, default=24)
     parser.add_argument("--preview-speed", type=float, default=0.5)
+    parser.add_argument("--prioritized", action="store_true", help="Usa replay priorizado (SumTree) con pesos IS")
+    parser.add_argument("--per-alpha", type=float, default=0.6, help="Exponente de prioridad alpha")
+    parser.add_argument("--per-beta", type=float, default=0.4, help="beta inicial de IS (se templa hasta 1.0)")
+    parser.add_argument("--n-steps", type=int, default=1, help="Retornos n-step en el target DQN (1 = TD clásico)")
+    parser.add_argument("--observacion", type=str, default="patch", choices=["patch", "rayos"],
+                        help="Sensor: patch egocéntrico (CNN) o rayos de distancia (MLP)")
+    parser.add_argument("--n-rayos", type=int, default=5, choices=range(1, 9),
+                        help="Número de rayos (1..8) con --observacion rayos")
+    parser.add_argument("--reset-modo", type=str, default="salida", choices=["salida", "uniforme", "fallos"],
+                        help="Inicio de episodio: salida oficial o spawns aleatorios (uniformes / ponderados por choques)")
+    parser.add_argument("--backend", type=str, default="python", choices=["python", "numba"],
+                        help="Backend de step del entorno (numba: kernel fusionado, mismos resultados)")
+    parser.add_argument("--politica", type=str, default="auto", choices=["auto", "cnn", "mlp"])
+    parser.add_argument("--apex", action="store_true", help="Modo actor–learner (Ape-X) con varios procesos actores")
+    parser.add_argument("--actores", type=int, default=4, help="Número de procesos actores en modo --apex")
+    parser.add_argument("--ratio-replay", type=float, default=None,
+                        help="Tope de pasos de gradiente por transición en modo --apex (por defecto sin tope)")
+    parser.add_argument("--apex-sync", type=int, default=200, help="Pasos de gradiente entre envíos de pesos a actores")
     args = parser.parse_args()
 
     set_seed(args.seed)
-    env = RacingEnv(ruta_csv=args.csv, patch_h=11, patch_w=11, render_mode=None)
-    env = Monitor(env)
 
     # Si hay muchos timesteps, reducimos verbosidad y solo mostramos RESUMEN final
     print_per_ep = args.timesteps <= 5000
     verbose_agent = 1 if print_per_ep else 0
+    dqn_kwargs = dict(verbose=verbose_agent, prioritized=args.prioritized,
+                      per_alpha=args.per_alpha, per_beta0=args.per_beta, politica=args.politica,
+                      n_steps=args.n_steps)
+    env_kwargs = dict(patch_h=11, patch_w=11, observacion=args.observacion, n_rayos=args.n_rayos,
+                      reset_modo=args.reset_modo, backend=args.backend)
+
+    if args.apex:
+        model, resumen = entrenar_apex(
+            args.csv, args.timesteps, n_actores=args.actores,
+            env_kwargs=env_kwargs, sync_cada=args.apex_sync,
+            ratio_replay=args.ratio_replay,
+            seed=args.seed, print_per_episode=print_per_ep, **dqn_kwargs
+        )
+        imprimir_resumen(resumen)
+        ensure_dir("models")
+        model.save(args.modelo_out)
+        print(f"\nModelo guardado en: {args.modelo_out}")
+        return
+
+    env = RacingEnv(ruta_csv=args.csv, render_mode=None, **env_kwargs)
+    env = Monitor(env)
+    # Siembra env.np_random (spawns aleatorios de reset_modo); learn() no vuelve a sembrarlo
+    env.reset(seed=args.seed)
 
-    model = crear_dqn(env, verbose=verbose_agent)
+    model = crear_dqn(env, **dqn_kwargs)
 
     stats_cb = StatsCallback(print_per_episode=print_per_ep)
     callbacks = [stats_cb]
@@ -126,7 +159,8 @@ def main():
             every_n_steps=args.preview_every,
             ppu=args.preview_ppu,
             fps=args.preview_fps,
-            speed_scale=args.preview_speed
+            speed_scale=args.preview_speed,
+            env_kwargs=env_kwargs
         ))
 
     model.learn(total_timesteps=args.timesteps, callback=CallbackList(callbacks))
@@ -12,6 +12,11 @@ def main():
     parser.add_argument("--render", type=bool, default=True)
     parser.add_argument("--ppu", type=int, default=36, help="Píxeles por unidad en renderer")
     parser.add_argument("--fps", type=int, default=30, help="FPS de visualización")
+    parser.add_argument("--observacion", type=str, default="patch", choices=["patch", "rayos"],
+                        help="Debe coincidir con el sensor usado al entrenar")
+    parser.add_argument("--n-rayos", type=int, default=5, choices=range(1, 9))
+    parser.add_argument("--backend", type=str, default="python", choices=["python", "numba"],
+                        help="Backend de step: 'numba' usa el kernel fusionado (si numba está instalado)")
     parser.add_argument("--speed-scale", type=float, default=0.4, help="Escala de velocidad SOLO visual (0.1..1.0)")
 
     args = parser.parse_args()
@@ -22,7 +27,10 @@ def main():
         patch_w=11,
         render_mode=("human" if args.render else None),
         renderer_ppu=args.ppu,
-        render_fps=args.fps
+        render_fps=args.fps,
+        observacion=args.observacion,
+        n_rayos=args.n_rayos,
+        backend=args.backend
     )
 
     env.set_visual_speed_scale(args.speed_scale)